@@ -1,105 +1,144 @@
 import threading
-import time
 from abc import ABC, ABCMeta, abstractmethod
 
-from greenlet import getcurrent as get_ident
-
 
 class SingletonMeta(ABCMeta):
     _instances = {}
     _lock = threading.Lock()
 
     def __call__(cls, *args, **kwargs):
+        # Lock-free once the instance exists, dict lookups are atomic
+        instance = cls._instances.get(cls)
+        if instance is not None:
+            return instance
         with cls._lock:
-            if cls not in cls._instances:
+            instance = cls._instances.get(cls)
+            if instance is None:
                 instance = super().__call__(*args, **kwargs)
                 cls._instances[cls] = instance
-        return cls._instances[cls]
+            return instance
 
 
 class CameraEvent:
     """An Event-like class that signals all active clients when a new frame is
     available.
+
+    A single condition guards a monotonic frame counter; every client thread
+    remembers the last frame it saw, so a frame published between two waits is
+    never lost.
     """
 
     def __init__(self):
-        self.events: dict[int : threading.Event()] = {}
-        self.lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._local = threading.local()
 
     def wait(self, timeout=None):
         """Invoked from each client's thread to wait for the next frame."""
-        ident = get_ident()
-        with self.lock:
-            if ident not in self.events:
-                self.events[ident] = threading.Event()
-            event = self.events[ident]
-        result = event.wait(timeout=timeout)
-        event.clear()
+        last_seen = getattr(self._local, "last_seen", None)
+        if last_seen is not None:
+            seq = self._seq
+            if seq > last_seen:
+                # A newer frame is already there, no need to take the lock
+                self._local.last_seen = seq
+                return True
+        with self._cond:
+            if last_seen is None:
+                # First wait from this thread: block until the next frame
+                last_seen = self._seq
+            result = self._cond.wait_for(lambda: self._seq > last_seen, timeout)
+            self._local.last_seen = self._seq
         return result
 
+    def mark(self):
+        """Makes this client's next wait() block until a frame newer than now."""
+        with self._cond:
+            self._local.last_seen = self._seq
+
+    def pending(self):
+        """Whether a frame this client has not seen yet is already available."""
+        last_seen = getattr(self._local, "last_seen", None)
+        return last_seen is not None and self._seq > last_seen
+
     def set(self):
         """Invoked by the camera thread when a new frame is available."""
-        with self.lock:
-            for event in self.events.values():
-                event.set()
-
-    def clear(self):
-        """Invoked from each client's thread after a frame was processed."""
-        self.events[get_ident()][0].clear()
+        with self._cond:
+            self._seq += 1
+            self._cond.notify_all()
 
 
 class BaseCamera(ABC, metaclass=SingletonMeta):
+    # Seconds start_streaming() waits for the first frame
+    FIRST_FRAME_TIMEOUT = 10.0
+
     def __init__(self):
         self._thread = None
         self._frame = None
         self._event = CameraEvent()
         self._lock = threading.Lock()
-        self._streaming = False
+        # Set while streaming, frame loops check it without taking a lock
+        self._stream_evt = threading.Event()
+        # Clients falling behind minus clients keeping up with the camera;
+        # updated without a lock, it is only a hint for adapting the stream
+        self._queue_pressure = 0
 
     def _thread_run(self):
         try:
             print("Camera thread starting...")
             for frame in self.frames():
-                with self._lock:
-                    if not self._streaming:
-                        break
-                    self._frame = frame
+                if not self._stream_evt.is_set():
+                    break
+                self._frame = frame
+                # set() publishes the new frame to the clients under its condition
                 self._event.set()
-                time.sleep(0)
             print("Camera thread finished normally")
         except Exception as e:
             print(f"Camera thread error: {e}")
             import traceback
 
             traceback.print_exc()
-            with self._lock:
-                self._streaming = False
+            self._stream_evt.clear()
 
     def start_streaming(self):
         with self._lock:
-            if not self._streaming:
-                self._streaming = True
+            if not self._stream_evt.is_set():
+                self._stream_evt.set()
+                # Request threads are pooled and may have seen frames of an
+                # earlier session, only a frame of this one counts
+                self._event.mark()
                 self._thread = threading.Thread(target=self._thread_run)
                 self._thread.daemon = True
                 self._thread.start()
         # Wait outside the lock with timeout
-        print("Waiting for first frame (10 second timeout)...")
-        success = self._event.wait(timeout=10.0)
+        timeout = self.FIRST_FRAME_TIMEOUT
+        print(f"Waiting for first frame ({timeout:g} second timeout)...")
+        success = self._event.wait(timeout=timeout)
         if not success:
             print("WARNING: Timeout waiting for first frame")
-            raise TimeoutError("Camera failed to produce first frame within 10 seconds")
+            raise TimeoutError(
+                f"Camera failed to produce first frame within {timeout:g} seconds"
+            )
 
     def stop_streaming(self):
-        with self._lock:
-            self._streaming = False
+        self._stream_evt.clear()
         if self._thread is not None:
             self._thread.join()
             self._thread = None
 
-    def get_frame(self):
-        self._event.wait()
-        with self._lock:
-            return self._frame
+    def get_frame(self, timeout=None):
+        """Waits for the next frame.
+
+        Returns None if none came within timeout or streaming has stopped, so a
+        frame left over from before the stop is not handed out.
+        """
+        if self._event.pending():
+            self._queue_pressure += 1
+        else:
+            self._queue_pressure -= 1
+        if not self._event.wait(timeout) or not self._stream_evt.is_set():
+            return None
+        # The camera thread swaps the whole reference, reading it is atomic
+        return self._frame
 
     @abstractmethod
     def frames(self):
@@ -1,4 +1,5 @@
 import io
+import threading
 import time
 
 try:
@@ -6,45 +7,150 @@ try:
 except ImportError:
     picamera = None
 
-from buildmecar.base_camera import BaseCamera
+from buildmecar.base_camera import BaseCamera, CameraEvent
+
+JPEG_SOI = b"\xff\xd8"
+
+# The sensor runs at the picture resolution; the GPU resizer scales the stream
+PICTURE_RESOLUTION = (1296, 972)
+STREAM_RESOLUTION = (320, 240)
+# Time for auto exposure and white balance to settle after opening the camera,
+# capture() itself does not wait for them
+WARMUP_SECONDS = 2
+
+# The stream quality steps down while clients fall behind the camera and back
+# up once they keep up, checked every QUALITY_CHECK_FRAMES frames. It never
+# goes above the quality the camera was created with
+DEFAULT_JPEG_QUALITY = 70
+MIN_JPEG_QUALITY = 25
+JPEG_QUALITY_STEP = 5
+QUALITY_CHECK_FRAMES = 20
+
+# How long a picture waits for a starting stream to open the camera
+PICAM_READY_TIMEOUT = 10.0
+
+
+class StreamingOutput:
+    """File-like sink for the MJPEG encoder that keeps the last complete frame."""
+
+    def __init__(self):
+        self.frame = None
+        self._parts = []
+        self.event = CameraEvent()
+
+    def write(self, buf):
+        if buf.startswith(JPEG_SOI) and self._parts:
+            # A new frame starts, publish the one collected so far. The encoder
+            # usually hands over a whole frame per write, which is kept as is
+            parts = self._parts
+            self.frame = parts[0] if len(parts) == 1 else b"".join(parts)
+            self.event.set()
+            self._parts = []
+        self._parts.append(buf)
+        return len(buf)
 
 
 class Camera(BaseCamera):
+    def __init__(self, jpeg_quality=DEFAULT_JPEG_QUALITY):
+        super().__init__()
+        # Upper bound of the adaptive stream quality
+        self._jpeg_quality = jpeg_quality
+        self._picam = None
+        # Set while _picam can take pictures
+        self._picam_ready = threading.Event()
+        # Held while a PiCamera is open, the device can only be opened once
+        self._device_lock = threading.Lock()
+        self._picture = io.BytesIO()
+
     def frames(self):
         print("Opening PiCamera...")
-        with picamera.PiCamera(resolution=(320, 240), framerate=10) as camera:
+        with (
+            self._device_lock,
+            picamera.PiCamera(resolution=PICTURE_RESOLUTION, framerate=10) as camera,
+        ):
             print("PiCamera opened successfully")
             camera.exposure_mode = "auto"
             camera.awb_mode = "auto"
-            print("Waiting 2 seconds for camera warmup...")
-            time.sleep(2)
+            print(f"Waiting {WARMUP_SECONDS} seconds for camera warmup...")
+            time.sleep(WARMUP_SECONDS)
             gain = camera.awb_gains
             camera.awb_mode = "off"
             camera.awb_gains = gain
-            print("Starting continuous capture...")
+            print("Starting MJPEG recording...")
 
-            stream = io.BytesIO()
-            for _ in camera.capture_continuous(stream, "jpeg", use_video_port=True):
-                with self._lock:
-                    if not self._streaming:
+            output = StreamingOutput()
+            quality = self._jpeg_quality
+            self._start_recording(camera, output, quality)
+            with self._lock:
+                self._picam = camera
+                self._picam_ready.set()
+            frame_count = 0
+            try:
+                while True:
+                    if not self._stream_evt.is_set():
                         print("Streaming stopped, breaking loop")
                         break
-                stream.seek(0)
-                yield stream.read()
-                stream.seek(0)
-                stream.truncate()
+                    # Raises if the encoder failed
+                    camera.wait_recording(0, splitter_port=1)
+                    if not output.event.wait(timeout=1.0):
+                        continue
+                    yield output.frame
+
+                    frame_count += 1
+                    if frame_count % QUALITY_CHECK_FRAMES == 0:
+                        new_quality = self._adapt_quality(quality)
+                        if new_quality != quality:
+                            print(f"Changing stream JPEG quality to {new_quality}")
+                            camera.stop_recording(splitter_port=1)
+                            quality = new_quality
+                            self._start_recording(camera, output, quality)
+            finally:
+                with self._lock:
+                    self._picam = None
+                    self._picam_ready.clear()
+                camera.stop_recording(splitter_port=1)
+
+    def _start_recording(self, camera, output, quality):
+        camera.start_recording(
+            output,
+            format="mjpeg",
+            resize=STREAM_RESOLUTION,
+            splitter_port=1,
+            quality=quality,
+        )
+
+    def _adapt_quality(self, quality):
+        pressure = self._queue_pressure
+        self._queue_pressure = 0
+        if pressure > 0:
+            min_quality = min(MIN_JPEG_QUALITY, self._jpeg_quality)
+            return max(min_quality, quality - JPEG_QUALITY_STEP)
+        if pressure < 0:
+            return min(self._jpeg_quality, quality + JPEG_QUALITY_STEP)
+        return quality
 
     def take_picture(self, filename):
-        was_streaming = self._streaming
-        if was_streaming:
-            self.stop_streaming()
-        with picamera.PiCamera() as camera:
+        # A starting stream already has the camera open, use it once it is warm
+        if self._stream_evt.is_set():
+            self._picam_ready.wait(timeout=PICAM_READY_TIMEOUT)
+        with self._lock:
+            if self._picam is not None:
+                # The still port captures from the already warm sensor while
+                # the recording keeps running; the file is written in one go
+                sink = self._picture
+                sink.seek(0)
+                sink.truncate()
+                self._picam.capture(sink, format="jpeg", use_video_port=False)
+                with open(filename, "wb") as f, sink.getbuffer() as data:
+                    f.write(data)
+                return
+            if self._stream_evt.is_set():
+                raise RuntimeError("camera stream is still starting, try again")
+        with (
+            self._device_lock,
+            picamera.PiCamera(resolution=PICTURE_RESOLUTION) as camera,
+        ):
             camera.exposure_mode = "auto"
             camera.awb_mode = "auto"
-            time.sleep(2)
-            gain = camera.awb_gains
-            camera.awb_mode = "off"
-            camera.awb_gains = gain
+            time.sleep(WARMUP_SECONDS)
             camera.capture(filename)
-        if was_streaming:
-            self.start_streaming()
@@ -1,10 +1,8 @@
 import logging
-import time
+import threading
 from typing import NamedTuple
 
-from buildhat import Hat, PassiveMotor
-
-logger = logging.getLogger("werkzeug")
+logger = logging.getLogger(__name__)
 
 
 class MotorDirections(NamedTuple):
@@ -17,9 +15,40 @@ class MotorDirections(NamedTuple):
 DEFAULT_MOTOR_SPEED = 98
 DEFAULT_MOTOR_PULSE = 1000
 
+_FRONT = MotorDirections(left_front=1, left_rear=1, right_front=1, right_rear=1)
+_REAR = MotorDirections(left_front=-1, left_rear=-1, right_front=-1, right_rear=-1)
+_RIGHT = MotorDirections(left_front=0.8, left_rear=-1, right_front=-0.8, right_rear=1)
+_LEFT = MotorDirections(left_front=-1, left_rear=1, right_front=1, right_rear=-1)
+_FRONT_LEFT = MotorDirections(
+    left_front=-1, left_rear=-1.0 / 2, right_front=1, right_rear=1.0 / 2
+)
+_FRONT_RIGHT = MotorDirections(
+    left_front=1, left_rear=0.0, right_front=-1, right_rear=0.0
+)
+_REAR_LEFT = MotorDirections(
+    left_front=-1.0 / 2, left_rear=-1, right_front=1.0 / 2, right_rear=1
+)
+_REAR_RIGHT = MotorDirections(
+    left_front=1.0 / 2, left_rear=1, right_front=-1.0 / 2, right_rear=-1
+)
+
+_DIRECTIONS = {
+    "front": _FRONT,
+    "rear": _REAR,
+    "right": _RIGHT,
+    "left": _LEFT,
+    "front_left": _FRONT_LEFT,
+    "front_right": _FRONT_RIGHT,
+    "rear_left": _REAR_LEFT,
+    "rear_right": _REAR_RIGHT,
+}
+
 
 class Car:
     def __init__(self):
+        # Imported here so that the web app and the tests load without buildhat
+        from buildhat import Hat, PassiveMotor
+
         try:
             self.hat = Hat()
             self._has_motors = True
@@ -36,121 +65,155 @@ class Car:
             self.motor_right_front = PassiveMotor("A")
             self.motor_right_rear = PassiveMotor("D")
 
-            self.directions_correction = MotorDirections(
-                left_front=-1.0,
-                left_rear=-1.0,
-                right_front=1.0,
-                right_rear=1.0,
+            # Same order as the MotorDirections fields
+            self._motors = (
+                self.motor_left_front,
+                self.motor_left_rear,
+                self.motor_right_front,
+                self.motor_right_rear,
+            )
+            self._port_names = tuple(
+                chr(motor.port + ord("A")) for motor in self._motors
+            )
+            # Last speed written to each motor, a repeated command is skipped
+            self._last_speeds = [None, None, None, None]
+
+        self.directions_correction = MotorDirections(
+            left_front=-1.0,
+            left_rear=-1.0,
+            right_front=1.0,
+            right_rear=1.0,
+        )
+        # Guards the motors between request threads and the pulse timer
+        self._lock = threading.Lock()
+        self._pulse_timer = None
+
+        # Directions with the wiring correction already applied
+        self._presets = {
+            name: MotorDirections(
+                *(c * d for c, d in zip(self.directions_correction, directions))
             )
+            for name, directions in _DIRECTIONS.items()
+        }
+        # Per-wheel integer speeds of every preset at the default speed
+        self._default_speeds = {
+            name: tuple(
+                int(coefficient * DEFAULT_MOTOR_SPEED) for coefficient in preset
+            )
+            for name, preset in self._presets.items()
+        }
 
-    def set_speed(self, motor: PassiveMotor, speed: int = DEFAULT_MOTOR_SPEED):
-        motor.start(int(speed))
-        port_name = chr(motor.port + ord("A"))
-        logger.info(f"Motor on port {port_name} set to speed {speed}")
+    def _start_motors(self, speeds: tuple[int, ...]) -> list[tuple[str, int]]:
+        """Starts the motors whose speed changed with a single serial write to
+        the Build HAT and returns their port names and new speeds.
 
-    def _run_motor(self, directions: MotorDirections, speed: int, time_ms: int) -> None:
+        Falls back to PassiveMotor.start() per motor for out of range speeds
+        (which it rejects) or if the buildhat internals are not available.
+        """
+        changed = [
+            (motor, port_name, speed)
+            for motor, port_name, speed, last_speed in zip(
+                self._motors, self._port_names, speeds, self._last_speeds
+            )
+            if speed != last_speed
+        ]
+        sent = [(port_name, speed) for _, port_name, speed in changed]
+        if not changed:
+            return sent
+        if all(-100 <= speed <= 100 for speed in speeds):
+            # The command PassiveMotor.start() sends, for every port at once
+            cmd = "".join(
+                f"port {motor.port} ; pwm ; set {speed / 100}\r"
+                for motor, _, speed in changed
+            )
+            try:
+                changed[0][0]._write(cmd)
+            except AttributeError:
+                pass
+            else:
+                for motor, _, speed in changed:
+                    motor._currentspeed = speed
+                self._last_speeds = list(speeds)
+                return sent
+        for motor, _, speed in changed:
+            motor.start(speed)
+        self._last_speeds = list(speeds)
+        return sent
+
+    def _drive(self, direction: str, speed: int, time_ms: int) -> None:
         """
         Using configuration from here:
         https://docs.revrobotics.com/duo-build/mecanum-drivetrain-kit-mecanum-drivetrain/mecanum-wheel-setup-and-behavior
 
         """
+        preset = self._presets[direction]
         if not self._has_motors:
             print(
-                f"SIMULATE: Motor command - directions={directions}, speed={speed}, time={time_ms}ms"
+                f"SIMULATE: Motor command - directions={preset}, speed={speed}, time={time_ms}ms"
             )
             return
-        self.set_speed(
-            self.motor_right_rear,
-            self.directions_correction.right_rear * directions.right_rear * speed,
-        )
-        self.set_speed(
-            self.motor_right_front,
-            self.directions_correction.right_front * directions.right_front * speed,
-        )
-        self.set_speed(
-            self.motor_left_rear,
-            self.directions_correction.left_rear * directions.left_rear * speed,
-        )
-        self.set_speed(
-            self.motor_left_front,
-            self.directions_correction.left_front * directions.left_front * speed,
-        )
-        time.sleep(time_ms / DEFAULT_MOTOR_PULSE)
+        if speed == DEFAULT_MOTOR_SPEED:
+            speeds = self._default_speeds[direction]
+        else:
+            speeds = tuple(int(coefficient * speed) for coefficient in preset)
+        with self._lock:
+            self._cancel_pulse()
+            sent = self._start_motors(speeds)
+            if time_ms > 0:
+                # Stop in the background so the request handler returns at once
+                self._pulse_timer = threading.Timer(
+                    time_ms / DEFAULT_MOTOR_PULSE, self._end_pulse
+                )
+                self._pulse_timer.daemon = True
+                self._pulse_timer.start()
+        for port_name, motor_speed in sent:
+            logger.info(f"Motor on port {port_name} set to speed {motor_speed}")
+
+    def _cancel_pulse(self) -> None:
+        if self._pulse_timer is not None:
+            self._pulse_timer.cancel()
+            self._pulse_timer = None
+
+    def _end_pulse(self) -> None:
+        with self._lock:
+            # A newer command replaced this pulse while the timer was firing
+            if self._pulse_timer is not threading.current_thread():
+                return
+            self._pulse_timer = None
+            self._stop_motors()
 
     def front(self, speed: int = DEFAULT_MOTOR_SPEED, time_ms: int = 0) -> None:
-        directions = MotorDirections(
-            left_front=1,
-            left_rear=1,
-            right_front=1,
-            right_rear=1,
-        )
-        self._run_motor(directions, speed, time_ms)
+        self._drive("front", speed, time_ms)
 
     def rear(self, speed: int = DEFAULT_MOTOR_SPEED, time_ms: int = 0) -> None:
-        directions = MotorDirections(
-            left_front=-1,
-            left_rear=-1,
-            right_front=-1,
-            right_rear=-1,
-        )
-        self._run_motor(directions, speed, time_ms)
+        self._drive("rear", speed, time_ms)
 
     def right(self, speed=DEFAULT_MOTOR_SPEED, time_ms=0):
-        directions = MotorDirections(
-            left_front=0.8,
-            left_rear=-1,
-            right_front=-0.8,
-            right_rear=1,
-        )
-        self._run_motor(directions, speed, time_ms)
+        self._drive("right", speed, time_ms)
 
     def left(self, speed: int = DEFAULT_MOTOR_SPEED, time_ms: int = 0) -> None:
-        directions = MotorDirections(
-            left_front=-1,
-            left_rear=1,
-            right_front=1,
-            right_rear=-1,
-        )
-        self._run_motor(directions, speed, time_ms)
+        self._drive("left", speed, time_ms)
 
     def front_left(self, speed: int = DEFAULT_MOTOR_SPEED, time_ms: int = 0) -> None:
-        directions = MotorDirections(
-            left_front=-1,
-            left_rear=-1.0 / 2,
-            right_front=1,
-            right_rear=1.0 / 2,
-        )
-        self._run_motor(directions, speed, time_ms)
+        self._drive("front_left", speed, time_ms)
 
     def front_right(self, speed: int = DEFAULT_MOTOR_SPEED, time_ms: int = 0) -> None:
-        directions = MotorDirections(
-            left_front=1,
-            left_rear=0.0,
-            right_front=-1,
-            right_rear=0.0,
-        )
-        self._run_motor(directions, speed, time_ms)
+        self._drive("front_right", speed, time_ms)
 
     def rear_left(self, speed: int = DEFAULT_MOTOR_SPEED, time_ms: int = 0) -> None:
-        directions = MotorDirections(
-            left_front=-1.0 / 2,
-            left_rear=-1,
-            right_front=1.0 / 2,
-            right_rear=1,
-        )
-        self._run_motor(directions, speed, time_ms)
+        self._drive("rear_left", speed, time_ms)
 
     def rear_right(self, speed: int = DEFAULT_MOTOR_SPEED, time_ms: int = 0) -> None:
-        directions = MotorDirections(
-            left_front=1.0 / 2,
-            left_rear=1,
-            right_front=-1.0 / 2,
-            right_rear=-1,
-        )
-        self._run_motor(directions, speed, time_ms)
+        self._drive("rear_right", speed, time_ms)
 
     def stop(self) -> None:
+        with self._lock:
+            self._cancel_pulse()
+            self._stop_motors()
+
+    def _stop_motors(self) -> None:
         self.motor_right_rear.stop()
         self.motor_right_front.stop()
         self.motor_left_rear.stop()
         self.motor_left_front.stop()
+        self._last_speeds = [0, 0, 0, 0]
@@ -1,93 +1,163 @@
 import datetime
+import functools
+import logging
 import os
-import re
-import time
+import subprocess
+import threading
 from pathlib import Path
 
 from flask import Flask, Response, jsonify, render_template, request
+from waitress import serve
 
-from buildmecar.camera_pi import Camera
+from buildmecar.camera_pi import DEFAULT_JPEG_QUALITY, Camera
 from buildmecar.car import Car
 
+logger = logging.getLogger(__name__)
 
-def execute_command(cmd: str):
-    r = os.popen(cmd)
-    text = r.read()
-    r.close()
-    return text
-
-
-video_devices = execute_command("ls /dev/video*")
-print(f"Video devices detected: {video_devices}")
-HAS_CAMERA_ON = bool(re.search(r"video0", video_devices, flags=re.I))
+HAS_CAMERA_ON = os.path.exists("/dev/video0")
 print(f"HAS_CAMERA_ON: {HAS_CAMERA_ON}")
 
 DEFAULT_MOTOR_SPEED = 98
 DEFAULT_MOTOR_PULSE = 1000
 
+
+def _jpeg_quality_from_env():
+    """Highest JPEG quality of the camera stream from BUILDMECAR_JPEG_Q."""
+    value = os.environ.get("BUILDMECAR_JPEG_Q")
+    if value is None:
+        return DEFAULT_JPEG_QUALITY
+    try:
+        quality = int(value)
+    except ValueError:
+        logger.warning(
+            "BUILDMECAR_JPEG_Q=%r is not an integer, using %d",
+            value,
+            DEFAULT_JPEG_QUALITY,
+        )
+        return DEFAULT_JPEG_QUALITY
+    if not 1 <= quality <= 100:
+        clamped = min(max(quality, 1), 100)
+        logger.warning(
+            "BUILDMECAR_JPEG_Q=%d is outside 1-100, using %d", quality, clamped
+        )
+        return clamped
+    return quality
+
+
+# Highest JPEG quality of the camera stream, it adapts down from here
+JPEG_QUALITY = _jpeg_quality_from_env()
+
+# Multipart MJPEG framing, the JPEG itself is yielded as a separate chunk
+FRAME_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n"
+FRAME_TRAILER = b"\r\n"
+
+# Waitress runs every request on a fixed pool of worker threads and each open
+# video stream holds one of them, so the streams are capped below the pool size
+# to keep workers free for the /cmd requests driving the car
+SERVER_THREADS = 8
+MAX_VIDEO_STREAMS = 4
+# How long a stream waits for a frame before checking whether it is still on
+FRAME_TIMEOUT = 1.0
+
 app = Flask(__name__)
 
-# Global state for camera streaming
-camera_streaming_enabled = False
+# Global state for camera streaming. The event is set only once camera_instance
+# is streaming, so readers never need a lock
+camera_streaming_enabled = threading.Event()
 camera_instance = None
+video_stream_slots = threading.BoundedSemaphore(MAX_VIDEO_STREAMS)
 
 
 # Automatically detects whether the camera exists and switches modes
 if HAS_CAMERA_ON:
 
     def gen(camera):
-        """Video streaming generator function."""
-        yield b"--frame\r\n"
-        while True:
-            frame = camera.get_frame()
-            yield b"Content-Type: image/jpeg\r\n\r\n" + frame + b"\r\n--frame\r\n"
+        """Video streaming generator function, ends once streaming is off."""
+        while camera_streaming_enabled.is_set():
+            frame = camera.get_frame(timeout=FRAME_TIMEOUT)
+            if frame is None:
+                continue
+            yield FRAME_HEADER % len(frame)
+            yield frame
+            yield FRAME_TRAILER
+
+    class VideoStream:
+        """Response body of a video stream holding one of video_stream_slots.
+
+        The server calls close() once it is done with the body, also when it
+        never iterated it (e.g. for HEAD), which gives the slot back.
+        """
+
+        def __init__(self, camera):
+            self._frames = gen(camera)
+            self._closed = False
+
+        def __iter__(self):
+            return self._frames
+
+        def close(self):
+            if self._closed:
+                return
+            self._closed = True
+            self._frames.close()
+            video_stream_slots.release()
 
     @app.route("/video_feed")
     def video_feed():
         """Video streaming route. Put this in the src attribute of an img tag."""
-        global camera_streaming_enabled, camera_instance
-        if not camera_streaming_enabled or camera_instance is None:
+        if not camera_streaming_enabled.is_set() or camera_instance is None:
             return Response("Camera streaming is disabled", status=503)
+        if not video_stream_slots.acquire(blocking=False):
+            return Response("Too many video streams", status=503)
 
+        # Hand the chunks straight to the server and keep proxies from
+        # buffering or caching the live stream
         return Response(
-            gen(camera_instance), mimetype="multipart/x-mixed-replace; boundary=frame"
+            VideoStream(camera_instance),
+            mimetype="multipart/x-mixed-replace; boundary=frame",
+            headers={"Cache-Control": "no-cache, no-store", "X-Accel-Buffering": "no"},
+            direct_passthrough=True,
         )
 
     @app.route("/toggle_camera", methods=["POST"])
     def toggle_camera():
         """Toggle camera streaming on/off."""
-        global camera_streaming_enabled, camera_instance
+        global camera_instance
         try:
-            camera_streaming_enabled = not camera_streaming_enabled
-            print(f"Camera streaming toggled to: {camera_streaming_enabled}")
+            streaming = not camera_streaming_enabled.is_set()
+            print(f"Camera streaming toggled to: {streaming}")
 
-            if camera_streaming_enabled:
+            if streaming:
                 if camera_instance is None:
                     print("Creating new Camera instance...")
-                    camera_instance = Camera()
+                    camera_instance = Camera(jpeg_quality=JPEG_QUALITY)
                 print("Starting camera streaming...")
                 camera_instance.start_streaming()
+                camera_streaming_enabled.set()
                 print("Camera streaming started successfully")
             else:
+                camera_streaming_enabled.clear()
                 if camera_instance is not None:
                     print("Stopping camera streaming...")
                     camera_instance.stop_streaming()
                     print("Camera streaming stopped")
 
-            return jsonify({"streaming": camera_streaming_enabled})
+            return jsonify({"streaming": streaming})
         except Exception as e:
             print(f"Error toggling camera: {e}")
             import traceback
 
             traceback.print_exc()
-            camera_streaming_enabled = False
+            camera_streaming_enabled.clear()
             return jsonify({"streaming": False, "error": str(e)}), 500
 
     @app.route("/camera_status")
     def camera_status():
         """Get current camera streaming status."""
-        global camera_streaming_enabled
-        return jsonify({"streaming": camera_streaming_enabled, "has_camera": True})
+        return jsonify({
+            "streaming": camera_streaming_enabled.is_set(),
+            "has_camera": True,
+        })
 
 else:
 
@@ -112,67 +182,111 @@ def take_picture():
     filename = f"{home}/picture_{timestamp}.jpg"
 
     if camera_instance is None:
-        camera_instance = Camera()
+        camera_instance = Camera(jpeg_quality=JPEG_QUALITY)
 
-    camera_instance.take_picture(filename)
+    try:
+        camera_instance.take_picture(filename)
+    except RuntimeError as e:
+        return f"Picture not taken: {e}"
     return f"Picture saved to {filename}"
 
 
+# Command ids sent by the web interface, the car commands are added once the
+# car is constructed
+COMMANDS = {"take-picture": take_picture}
+
+
 def main(status):
-    result = None
-    match status:
-        case "ic-up":
-            car.front()
-        case "ic-left":
-            car.left()
-        case "ic-right":
-            car.right()
-        case "ic-down":
-            car.rear()
-        case "ic-stop":
-            car.stop()
-        case "stop":
-            car.stop()
-        case "ic-left-up":
-            car.front_left()
-        case "ic-right-up":
-            car.front_right()
-        case "ic-left-down":
-            car.rear_left()
-        case "ic-right-down":
-            car.rear_right()
-        case "take-picture":
-            result = take_picture()
-
-    print(status, result)
+    command = COMMANDS.get(status)
+    result = command() if command is not None else None
+    logger.debug("cmd %s: %s", status, result)
     return result
 
 
+# Rendered on the first request rather than at import, so that url_for() sees
+# the real request environment
+@functools.cache
+def index_page():
+    """Home page HTML, rendered once as it has no per-request inputs."""
+    print(f"Rendering index with has_camera={HAS_CAMERA_ON}")
+    return render_template("index.jinja", has_camera=HAS_CAMERA_ON)
+
+
+@app.after_request
+def log_request(response):
+    """Access log for every request, waitress does not write one itself."""
+    logger.info(
+        '%s "%s %s" %s',
+        request.remote_addr,
+        request.method,
+        request.path,
+        response.status_code,
+    )
+    return response
+
+
 @app.route("/")
 def index():
     """Video streaming home page."""
-    print(f"Rendering index with has_camera={HAS_CAMERA_ON}")
-    return render_template("index.jinja", has_camera=HAS_CAMERA_ON)
+    return index_page()
 
 
 @app.route("/cmd", methods=["GET", "POST"])
 def button():
     if request.method == "POST":
-        data = request.form.to_dict()
-        result = main(data["id"])
+        result = main(request.form["id"])
         return jsonify({
             "status": "ok",
             "message": result if result else "command executed",
         })
-    return render_template("index.jinja", has_camera=HAS_CAMERA_ON)
+    return index_page()
 
 
 if __name__ == "__main__":
-    # Initialize rc.local if on Raspberry Pi
+    # Waitress leaves logging unconfigured, unlike the Flask development server
+    logging.basicConfig(
+        level=logging.INFO, format="%(levelname)s %(name)s: %(message)s"
+    )
+
+    # Initialize rc.local if on Raspberry Pi, in parallel with the car setup
+    rc_local = None
     if os.path.exists("/etc/rc.local"):
-        os.system("/etc/rc.local")
-        time.sleep(1)
+        try:
+            rc_local = subprocess.Popen(["/etc/rc.local"], stdout=subprocess.DEVNULL)
+        except OSError as e:
+            # E.g. not executable or without a shebang, the server runs anyway
+            logger.error("Could not run /etc/rc.local: %s", e)
 
     # Initialize global car instance
     car = Car()
-    app.run(host="0.0.0.0", port=5002, threaded=True, debug=False)
+    COMMANDS.update({
+        "ic-up": car.front,
+        "ic-left": car.left,
+        "ic-right": car.right,
+        "ic-down": car.rear,
+        "ic-stop": car.stop,
+        "stop": car.stop,
+        "ic-left-up": car.front_left,
+        "ic-right-up": car.front_right,
+        "ic-left-down": car.rear_left,
+        "ic-right-down": car.rear_right,
+    })
+    if rc_local is not None:
+        try:
+            rc_local.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            logger.warning("rc.local still running, starting the server anyway")
+            # Reap it in the background once it finishes
+            threading.Thread(target=rc_local.wait, daemon=True).start()
+
+    # A worker blocks once a client has more than outbuf_high_watermark bytes
+    # unsent. 64 KiB is a few 320x240 stream frames, so a slow video client
+    # falls behind the camera at once, which lowers the stream quality, instead
+    # of queueing seconds of stale frames
+    serve(
+        app,
+        host="0.0.0.0",
+        port=5002,
+        threads=SERVER_THREADS,
+        outbuf_high_watermark=64 * 1024,
+    )
@@ -1,22 +1,24 @@
 import time
 
-from buildhat import Hat, PassiveMotor
-
 
 def main():
+    from buildhat import Hat, PassiveMotor
+
     hat = Hat()
     print(hat.get())
 
     motor_direction = 1
+    # Quadratic ramp up to full speed, denser at low speeds where it matters
+    ramp = [motor_direction * int(100 * (i / 15) ** 2) for i in range(16)]
 
     # Initializing Motor
     for motor_name in ["A", "B", "C", "D"]:
         _motor = PassiveMotor(motor_name)
         print(f"Started motor {motor_name}")
 
-        for i in range(0, 100):
-            _motor.start(i * motor_direction)
-            time.sleep(0.1)
+        for speed in ramp:
+            _motor.start(speed)
+            time.sleep(0.05)
 
         # delay 1s
         time.sleep(1)
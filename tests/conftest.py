@@ -0,0 +1,40 @@
+"""Shared test fixtures."""
+
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture
+def buildhat(monkeypatch):
+    """Stand-in buildhat module that records what is sent to the motors.
+
+    Serial commands land in ``buildhat.writes`` and calls of the PassiveMotor
+    API in ``buildhat.calls`` as ``(method, port, *args)`` tuples.
+    """
+    module = types.ModuleType("buildhat")
+    module.writes = []
+    module.calls = []
+
+    class Hat:
+        pass
+
+    class PassiveMotor:
+        def __init__(self, port: str):
+            self.port = ord(port) - ord("A")
+            self._currentspeed = 0
+
+        def _write(self, cmd: str):
+            module.writes.append(cmd)
+
+        def start(self, speed: int):
+            module.calls.append(("start", self.port, speed))
+
+        def stop(self):
+            module.calls.append(("stop", self.port))
+
+    module.Hat = Hat
+    module.PassiveMotor = PassiveMotor
+    monkeypatch.setitem(sys.modules, "buildhat", module)
+    return module
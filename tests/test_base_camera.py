@@ -14,7 +14,7 @@ from typing import Generator
 
 import pytest
 
-from buildmecar.base_camera import BaseCamera
+from buildmecar.base_camera import BaseCamera, CameraEvent
 
 
 class MockCamera(BaseCamera):
@@ -29,9 +29,8 @@ class MockCamera(BaseCamera):
     def frames(self) -> Generator[bytes, None, None]:
         """Generate mock frames."""
         for i in range(self.frame_count):
-            with self._lock:
-                if not self._streaming:
-                    break
+            if not self._stream_evt.is_set():
+                break
             self.frames_generated += 1
             time.sleep(self.frame_delay)
             yield f"frame_{i}".encode()
@@ -42,16 +41,20 @@ class MockCamera(BaseCamera):
             f.write("mock_picture")
 
 
+@pytest.fixture(autouse=True)
+def _reset_singleton():
+    """Let every test construct its own camera instance."""
+    MockCamera._instances.pop(MockCamera, None)
+    yield
+
+
 @pytest.fixture
 def camera():
     """Create a fresh camera instance for each test."""
-    # Clear singleton instance
-    if MockCamera in MockCamera._instances:
-        del MockCamera._instances[MockCamera]
     cam = MockCamera(frame_count=10, frame_delay=0.01)
     yield cam
     # Cleanup
-    if cam._streaming:
+    if cam._stream_evt.is_set():
         cam.stop_streaming()
 
 
@@ -60,20 +63,17 @@ class TestCameraBasics:
 
     def test_camera_initializes_correctly(self, camera):
         """Camera should initialize with streaming off."""
-        assert not camera._streaming
+        assert not camera._stream_evt.is_set()
         assert camera._thread is None
         assert camera._frame is None
 
     def test_camera_is_singleton(self):
         """Same camera instance should be returned."""
-        if MockCamera in MockCamera._instances:
-            del MockCamera._instances[MockCamera]
-
         cam1 = MockCamera()
         cam2 = MockCamera()
         assert cam1 is cam2
 
-        if cam1._streaming:
+        if cam1._stream_evt.is_set():
             cam1.stop_streaming()
 
     @pytest.mark.parametrize(
@@ -86,14 +86,11 @@ class TestCameraBasics:
     )
     def test_camera_generates_frames(self, frame_count, delay):
         """Camera should generate the specified number of frames."""
-        if MockCamera in MockCamera._instances:
-            del MockCamera._instances[MockCamera]
-
         camera = MockCamera(frame_count=frame_count, frame_delay=delay)
         camera.start_streaming()
 
-        # Wait for all frames to be generated
-        time.sleep((frame_count + 2) * delay)
+        # The camera thread ends once all frames are generated
+        camera._thread.join(timeout=1.0)
 
         camera.stop_streaming()
         assert camera.frames_generated <= frame_count
@@ -106,7 +103,7 @@ class TestStreaming:
         """Starting streaming should set the flag and create thread."""
         camera.start_streaming()
 
-        assert camera._streaming
+        assert camera._stream_evt.is_set()
         assert camera._thread is not None
         assert camera._frame is not None  # First frame should be available
 
@@ -117,7 +114,7 @@ class TestStreaming:
         camera.start_streaming()
         camera.stop_streaming()
 
-        assert not camera._streaming
+        assert not camera._stream_evt.is_set()
         assert camera._thread is None
 
     def test_restart_streaming(self, camera):
@@ -135,16 +132,30 @@ class TestStreaming:
         assert frame1 is not None
         assert frame2 is not None
 
+    def test_restart_on_the_same_thread_waits_for_a_new_frame(self, camera):
+        """A restart should not count frames of the earlier session."""
+        camera.start_streaming()
+        camera.get_frame()
+        # Leave frames this thread has not seen when the session ends
+        time.sleep(0.05)
+        camera.stop_streaming()
+
+        # The restarted camera never produces a frame
+        camera.frame_count = 0
+        camera.FIRST_FRAME_TIMEOUT = 0.1
+        with pytest.raises(TimeoutError):
+            camera.start_streaming()
+
     def test_stop_prevents_new_frames(self, camera):
-        """Stopping should prevent new frames from being generated."""
+        """No frame should reach a client after streaming stopped."""
         camera.start_streaming()
+        camera.get_frame()
+        # Leave frames this thread has not seen when the stream stops
         time.sleep(0.05)
 
-        initial_count = camera.frames_generated
         camera.stop_streaming()
-        time.sleep(0.05)
 
-        assert camera.frames_generated == initial_count
+        assert camera.get_frame(timeout=0.05) is None
 
 
 class TestFrameRetrieval:
@@ -168,13 +179,20 @@ class TestFrameRetrieval:
         for _ in range(3):
             frame = camera.get_frame()
             frames.append(frame)
-            time.sleep(0.02)
 
         camera.stop_streaming()
 
         # At least some frames should differ
         assert len(set(frames)) >= 2
 
+    def test_get_frame_times_out_without_new_frame(self):
+        """get_frame should give up with None once no frames come anymore."""
+        camera = MockCamera(frame_count=1, frame_delay=0.01)
+        camera.start_streaming()
+
+        assert camera.get_frame(timeout=0.05) is None
+        camera.stop_streaming()
+
     def test_concurrent_frame_access(self, camera):
         """Multiple threads should safely access frames."""
         camera.start_streaming()
@@ -197,6 +215,119 @@ class TestFrameRetrieval:
         # All threads should have received frames
         assert len(received) == 15  # 3 threads × 5 frames
 
+    def test_clients_share_the_encoded_frame(self):
+        """All clients woken by a frame should get the very same object."""
+        camera = MockCamera(frame_count=3, frame_delay=0.2)
+        camera.start_streaming()
+
+        received = []
+
+        def get_frame():
+            received.append(camera.get_frame())
+
+        threads = [threading.Thread(target=get_frame) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=2.0)
+
+        camera.stop_streaming()
+
+        assert len(received) == 3
+        assert all(frame is received[0] for frame in received)
+
+    def test_slow_client_skips_to_newest_frame(self, camera):
+        """A client that fell behind should get the newest frame, not a backlog."""
+        camera.start_streaming()
+
+        first = camera.get_frame()
+        time.sleep(0.05)  # the client is busy while the camera moves on
+        second = camera.get_frame()
+
+        camera.stop_streaming()
+
+        first_index = int(first.split(b"_")[1])
+        second_index = int(second.split(b"_")[1])
+        assert second_index - first_index > 1
+
+
+class TestQueuePressure:
+    """Test how get_frame reports clients falling behind the camera."""
+
+    def test_get_frame_counts_clients_behind_and_keeping_up(self):
+        """A frame already waiting adds pressure, waiting for one removes it."""
+        camera = MockCamera()
+        # Streaming without a camera thread, frames are published by hand
+        camera._stream_evt.set()
+        camera._event.mark()
+        camera._frame = b"frame"
+        camera._event.set()
+        camera._event.set()
+
+        assert camera.get_frame(timeout=0) is not None
+        assert camera._queue_pressure == 1
+
+        assert camera.get_frame(timeout=0) is None
+        assert camera._queue_pressure == 0
+
+
+class TestCameraEvent:
+    """Test frame signalling between the camera thread and clients."""
+
+    def test_wait_times_out_without_frame(self):
+        """wait should report a timeout when no frame is published."""
+        event = CameraEvent()
+        assert not event.wait(timeout=0.01)
+
+    def test_frame_set_between_waits_is_not_lost(self):
+        """A frame published while the client is busy wakes the next wait."""
+        event = CameraEvent()
+        event.wait(timeout=0.01)  # registers this thread's position
+        event.set()
+        event.set()
+        assert event.wait(timeout=0.01)
+        assert not event.wait(timeout=0.01)
+
+    def test_each_frame_wakes_a_client_once(self):
+        """After a frame was consumed, wait should block until the next one."""
+        event = CameraEvent()
+        event.wait(timeout=0.01)
+        for _ in range(3):
+            event.set()
+            assert event.wait(timeout=0.01)
+            assert not event.wait(timeout=0.01)
+
+    def test_pending_reports_unseen_frame(self):
+        """pending should tell whether a newer frame is already available."""
+        event = CameraEvent()
+        assert not event.pending()
+        event.wait(timeout=0.01)
+        event.set()
+        assert event.pending()
+        event.wait(timeout=0.01)
+        assert not event.pending()
+
+    def test_set_wakes_all_clients(self):
+        """A single set should wake every waiting client."""
+        event = CameraEvent()
+        registered = threading.Barrier(4)
+        results = []
+
+        def wait_for_frame():
+            event.wait(timeout=0)  # registers this thread's position
+            registered.wait()
+            results.append(event.wait(timeout=1.0))
+
+        threads = [threading.Thread(target=wait_for_frame) for _ in range(3)]
+        for t in threads:
+            t.start()
+        registered.wait(timeout=1.0)
+        event.set()
+        for t in threads:
+            t.join(timeout=1.0)
+
+        assert results == [True, True, True]
+
 
 class TestTakePicture:
     """Test taking pictures."""
@@ -0,0 +1,129 @@
+"""
+Tests for the Raspberry Pi camera logic that runs without picamera.
+
+Tests cover:
+- Splitting the MJPEG encoder output into frames
+- Adapting the stream JPEG quality to the queue pressure
+"""
+
+import pytest
+
+from buildmecar.camera_pi import (
+    DEFAULT_JPEG_QUALITY,
+    JPEG_QUALITY_STEP,
+    JPEG_SOI,
+    MIN_JPEG_QUALITY,
+    Camera,
+    StreamingOutput,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_singleton():
+    """Let every test construct its own camera instance."""
+    Camera._instances.pop(Camera, None)
+    yield
+    Camera._instances.pop(Camera, None)
+
+
+@pytest.fixture
+def output():
+    """Encoder sink whose frames the test thread watches from now on."""
+    output = StreamingOutput()
+    output.event.mark()
+    return output
+
+
+class TestStreamingOutput:
+    """Test how the encoder output is split into frames on the JPEG SOI marker."""
+
+    def test_frame_is_published_once_the_next_one_starts(self, output):
+        """A frame is only complete, and published, when the next SOI arrives."""
+        output.write(JPEG_SOI + b"first")
+
+        assert output.frame is None
+        assert not output.event.wait(timeout=0)
+
+        output.write(JPEG_SOI + b"second")
+
+        assert output.frame == JPEG_SOI + b"first"
+        assert output.event.wait(timeout=0)
+
+    def test_single_write_is_published_as_is(self, output):
+        """A frame handed over in one write should not be copied."""
+        frame = JPEG_SOI + b"whole frame"
+        output.write(frame)
+        output.write(JPEG_SOI + b"next")
+
+        assert output.frame is frame
+
+    def test_frame_split_across_writes_is_joined(self, output):
+        """Parts of one frame should be joined into a single frame."""
+        output.write(JPEG_SOI + b"head")
+        output.write(b"middle")
+        output.write(b"tail")
+
+        assert output.frame is None
+
+        output.write(JPEG_SOI + b"next")
+
+        assert output.frame == JPEG_SOI + b"headmiddletail"
+
+    def test_write_returns_the_bytes_taken(self, output):
+        """The encoder expects write() to report the whole buffer as written."""
+        assert output.write(JPEG_SOI + b"frame") == len(JPEG_SOI) + 5
+
+
+class TestAdaptQuality:
+    """Test the stream quality steps taken every QUALITY_CHECK_FRAMES frames."""
+
+    def test_pressure_steps_the_quality_down(self):
+        """Clients falling behind should lower the quality by one step."""
+        camera = Camera()
+        camera._queue_pressure = 3
+
+        quality = camera._adapt_quality(DEFAULT_JPEG_QUALITY)
+
+        assert quality == DEFAULT_JPEG_QUALITY - JPEG_QUALITY_STEP
+        assert camera._queue_pressure == 0
+
+    def test_clients_keeping_up_step_the_quality_up(self):
+        """Clients keeping up should raise the quality by one step."""
+        camera = Camera()
+        camera._queue_pressure = -2
+
+        assert camera._adapt_quality(50) == 50 + JPEG_QUALITY_STEP
+        assert camera._queue_pressure == 0
+
+    def test_balanced_pressure_keeps_the_quality(self):
+        """Without pressure either way the quality should stay."""
+        camera = Camera()
+
+        assert camera._adapt_quality(50) == 50
+
+    @pytest.mark.parametrize(
+        "quality", [DEFAULT_JPEG_QUALITY - 2, DEFAULT_JPEG_QUALITY]
+    )
+    def test_quality_does_not_rise_above_the_configured_one(self, quality):
+        """Stepping up should stop at the quality the camera was created with."""
+        camera = Camera(jpeg_quality=DEFAULT_JPEG_QUALITY)
+        camera._queue_pressure = -1
+
+        assert camera._adapt_quality(quality) == DEFAULT_JPEG_QUALITY
+
+    @pytest.mark.parametrize("quality", [MIN_JPEG_QUALITY + 2, MIN_JPEG_QUALITY])
+    def test_quality_does_not_drop_below_the_minimum(self, quality):
+        """Stepping down should stop at MIN_JPEG_QUALITY."""
+        camera = Camera()
+        camera._queue_pressure = 1
+
+        assert camera._adapt_quality(quality) == MIN_JPEG_QUALITY
+
+    @pytest.mark.parametrize("pressure", [1, -1])
+    def test_quality_below_the_minimum_stays_put(self, pressure):
+        """A configured quality below MIN_JPEG_QUALITY should not be changed."""
+        low_quality = MIN_JPEG_QUALITY - 5
+        camera = Camera(jpeg_quality=low_quality)
+        camera._queue_pressure = pressure
+
+        assert camera._adapt_quality(low_quality) == low_quality
@@ -0,0 +1,123 @@
+"""
+Tests for Car motor control.
+
+Tests cover:
+- Batching the wheel speeds into one Build HAT write
+- Skipping wheels whose speed did not change
+- Timed pulses and their cancellation by newer commands
+"""
+
+import threading
+
+import pytest
+
+from buildmecar.car import Car
+
+
+@pytest.fixture
+def car(buildhat):
+    """Car driving the stand-in Build HAT motors."""
+    car = Car()
+    yield car
+    # Cancels any pulse timer still pending
+    car.stop()
+
+
+def written_ports(cmd: str) -> set[int]:
+    """Ports addressed by a batched serial command."""
+    return {int(part.split()[1]) for part in cmd.split("\r") if part}
+
+
+class TestSpeedWrites:
+    """Test how wheel speeds reach the Build HAT."""
+
+    def test_drive_sends_one_combined_write(self, car, buildhat):
+        """All four wheels should be set with a single serial write."""
+        car.front()
+
+        assert len(buildhat.writes) == 1
+        assert written_ports(buildhat.writes[0]) == {0, 1, 2, 3}
+        assert "port 1 ; pwm ; set -0.98\r" in buildhat.writes[0]
+        assert car.motor_left_front._currentspeed == -98
+        assert car.motor_right_front._currentspeed == 98
+        assert buildhat.calls == []
+
+    def test_repeated_command_is_skipped(self, car, buildhat):
+        """Repeating a command should not write to the Build HAT again."""
+        car.front()
+        car.front()
+
+        assert len(buildhat.writes) == 1
+
+    def test_unchanged_wheels_are_skipped(self, car, buildhat):
+        """Only wheels whose speed changed should be in the next write."""
+        car.front()
+        car.front_right()
+
+        assert len(buildhat.writes) == 2
+        # The left front wheel keeps its speed between the two directions
+        assert written_ports(buildhat.writes[1]) == {0, 2, 3}
+
+    def test_stop_resets_the_speed_cache(self, car, buildhat):
+        """After a stop the same command should set every wheel again."""
+        car.front()
+        car.stop()
+        car.front()
+
+        assert [call for call in buildhat.calls if call[0] == "stop"] == [
+            ("stop", 3),
+            ("stop", 0),
+            ("stop", 2),
+            ("stop", 1),
+        ]
+        assert len(buildhat.writes) == 2
+        assert written_ports(buildhat.writes[1]) == {0, 1, 2, 3}
+
+    def test_out_of_range_speed_falls_back_to_start(self, car, buildhat):
+        """Speeds the batched command cannot carry go through start()."""
+        car.front(speed=150)
+
+        assert buildhat.writes == []
+        assert sorted(buildhat.calls) == [
+            ("start", 0, 150),
+            ("start", 1, -150),
+            ("start", 2, -150),
+            ("start", 3, 150),
+        ]
+
+
+class TestPulses:
+    """Test commands that stop the car after a given time."""
+
+    def test_pulse_stops_the_motors(self, car, buildhat):
+        """The pulse timer should stop every motor once it fires."""
+        car.front(time_ms=10)
+        timer = car._pulse_timer
+        timer.join(timeout=1.0)
+
+        assert len([call for call in buildhat.calls if call[0] == "stop"]) == 4
+        assert car._pulse_timer is None
+
+    def test_new_command_cancels_the_pulse(self, car, buildhat):
+        """A newer command should cancel the pending pulse timer."""
+        car.front(time_ms=10_000)
+        old_timer = car._pulse_timer
+        car.left()
+
+        assert old_timer.finished.is_set()
+        assert car._pulse_timer is None
+        assert buildhat.calls == []
+
+    def test_old_timer_does_not_stop_a_newer_command(self, car, buildhat):
+        """A timer firing after it was replaced should leave the motors on."""
+        car.front(time_ms=10_000)
+        car.left(time_ms=10_000)
+        new_timer = car._pulse_timer
+
+        # Stands in for the old timer thread firing just before its cancel
+        late_timer = threading.Thread(target=car._end_pulse)
+        late_timer.start()
+        late_timer.join(timeout=1.0)
+
+        assert buildhat.calls == []
+        assert car._pulse_timer is new_timer
@@ -0,0 +1,141 @@
+"""
+Tests for the web app.
+
+Tests cover:
+- Serving and ending the MJPEG video stream
+- Giving video stream slots back however a stream ends
+"""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+import buildmecar
+
+
+class FakeCamera:
+    """Camera that has a frame ready whenever it is streaming."""
+
+    def __init__(self, **kwargs):
+        self.streaming = False
+
+    def start_streaming(self):
+        self.streaming = True
+
+    def stop_streaming(self):
+        self.streaming = False
+
+    def get_frame(self, timeout=None):
+        return b"jpeg" if self.streaming else None
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    """buildmecar.main imported afresh as if a camera was connected."""
+    exists = os.path.exists
+    # The package re-exports main() under the name of its module
+    monkeypatch.setattr(buildmecar, "main", buildmecar.main)
+    monkeypatch.delitem(sys.modules, "buildmecar.main")
+    with monkeypatch.context() as m:
+        m.setattr(os.path, "exists", lambda path: path == "/dev/video0" or exists(path))
+        module = importlib.import_module("buildmecar.main")
+    monkeypatch.setattr(module, "Camera", FakeCamera)
+    return module
+
+
+@pytest.fixture
+def client(app_module):
+    """Test client with camera streaming turned on."""
+    client = app_module.app.test_client()
+    assert client.post("/toggle_camera").json == {"streaming": True}
+    return client
+
+
+def assert_all_slots_free(app_module, client):
+    """Every stream slot should be available to a new client."""
+    responses = [client.get("/video_feed") for _ in range(app_module.MAX_VIDEO_STREAMS)]
+    assert [response.status_code for response in responses] == [200] * len(responses)
+    for response in responses:
+        response.close()
+
+
+class TestVideoStreamSlots:
+    """Test that a stream gives its slot back when it ends."""
+
+    def test_head_gives_the_slot_back(self, app_module, client):
+        """HEAD requests never iterate the stream but should not keep a slot."""
+        for _ in range(app_module.MAX_VIDEO_STREAMS + 1):
+            response = client.head("/video_feed")
+            assert response.status_code == 200
+            # What the server does with every response it has sent
+            response.close()
+
+        assert_all_slots_free(app_module, client)
+
+    def test_closing_early_gives_the_slot_back(self, app_module, client):
+        """A client going away mid-stream should free its slot."""
+        response = client.get("/video_feed")
+        next(iter(response.response))
+        response.close()
+
+        assert_all_slots_free(app_module, client)
+
+    def test_unstarted_stream_gives_the_slot_back_once(self, app_module, client):
+        """Closing a body that was never iterated should free exactly one slot."""
+        app_module.video_stream_slots.acquire()
+        stream = app_module.VideoStream(app_module.camera_instance)
+        stream.close()
+        # A second close must not release a slot it does not hold
+        stream.close()
+
+        assert_all_slots_free(app_module, client)
+
+
+class TestVideoStreamLifecycle:
+    """Test when video streams are served and when they end."""
+
+    def test_stream_is_refused_while_streaming_is_off(self, app_module):
+        """Without a streaming camera the feed should answer 503."""
+        client = app_module.app.test_client()
+
+        assert client.get("/video_feed").status_code == 503
+
+    def test_stream_sends_mjpeg_frames(self, client):
+        """Each frame should go out as a multipart part of its own."""
+        response = client.get("/video_feed")
+        chunks = iter(response.response)
+
+        assert next(chunks).startswith(b"--frame\r\n")
+        assert next(chunks) == b"jpeg"
+        assert next(chunks) == b"\r\n"
+        response.close()
+
+    def test_stream_ends_when_streaming_is_turned_off(self, app_module, client):
+        """Toggling the camera off should end open streams and free their slots."""
+        response = client.get("/video_feed")
+        chunks = iter(response.response)
+        next(chunks)
+
+        assert client.post("/toggle_camera").json == {"streaming": False}
+        # The generator runs out instead of waiting for frames forever
+        list(chunks)
+        response.close()
+
+        assert client.post("/toggle_camera").json == {"streaming": True}
+        assert_all_slots_free(app_module, client)
+
+    def test_streams_beyond_the_limit_are_refused(self, app_module, client):
+        """Only MAX_VIDEO_STREAMS streams should hold server workers at once."""
+        responses = [
+            client.get("/video_feed") for _ in range(app_module.MAX_VIDEO_STREAMS)
+        ]
+
+        assert client.get("/video_feed").status_code == 503
+
+        responses.pop().close()
+        responses.append(client.get("/video_feed"))
+        assert responses[-1].status_code == 200
+        for response in responses:
+            response.close()